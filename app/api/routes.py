@@ -85,17 +85,50 @@ async def monthly_update(
         logger.error(f"Erro na atualização mensal: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk-upload", response_model=dict)
+def bulk_upload(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """Upload em lote de vários CSVs compactados em um ZIP
+    
+    Endpoint síncrono: o FastAPI o executa no threadpool, de modo que o
+    parsing em paralelo e o treino não bloqueiam o event loop.
+    """
+    if not file.filename.endswith('.zip'):
+        raise HTTPException(status_code=400, detail="Arquivo deve ser um ZIP")
+    
+    try:
+        # Extrair CSVs, descartar os já ingeridos e salvar o restante em lote
+        content = file.file.read()
+        result = data_service.ingest_files(db, CSVProcessor.extract_zip(content))
+        
+        # Treinar modelos uma única vez se há dados ainda não treinados; inclui
+        # dados gravados por uma tentativa anterior cujo treino falhou
+        models_trained = data_service.needs_training(db)
+        accuracy_scores = data_service.train_models(db) if models_trained else {}
+        
+        return {
+            "message": "Upload em lote realizado com sucesso",
+            **result,
+            "modelos_treinados": models_trained,
+            "acuracia": accuracy_scores
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro no upload em lote: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/predictions", response_model=PredictionsResponse)
 async def get_predictions(db: Session = Depends(get_db)):
     """Obter previsões atuais"""
     try:
         # Obter competência mais recente
-        all_data = data_service.get_all_financial_data(db)
-        if not all_data:
+        latest_competencia = data_service.get_latest_competencia(db)
+        if not latest_competencia:
             raise HTTPException(status_code=400, detail="Não há dados disponíveis")
         
-        latest_competencia = max([data['competencia'] for data in all_data])
-        
         # Gerar previsões (o método já treina o modelo se necessário)
         predictions = data_service.generate_predictions(db, latest_competencia)
         
@@ -137,16 +170,20 @@ async def get_model_stats(db: Session = Depends(get_db)):
     try:
         stats = data_service.get_database_stats(db)
         
-        # Calcular acurácia média
+        # Calcular acurácia média (R²)
         accuracy_scores = data_service.predictor.accuracy_scores
-        avg_accuracy = sum(accuracy_scores.values()) / len(accuracy_scores) if accuracy_scores else 0.0
+        avg_accuracy = sum(float(v.get("r2", 0.0)) for v in accuracy_scores.values()) / len(accuracy_scores) if accuracy_scores else 0.0
+        
+        # Família do modelo escolhida para cada tipo
+        model_families = data_service.predictor.get_model_families()
         
         # Contar previsões no histórico
         from app.models.database import PredictionHistory
         total_predictions = db.query(PredictionHistory).count()
         
         return ModelStatsResponse(
-            modelo_ativo="linear_regression",
+            modelo_ativo=", ".join(f"{tipo}: {familia}" for tipo, familia in model_families.items()),
+            modelos=model_families,
             total_previsoes=total_predictions,
             acuracia_media=avg_accuracy,
             ultima_atualizacao=data_service.predictor.last_training_date or datetime.utcnow(),
@@ -0,0 +1,250 @@
+"""Pipeline em lote pela linha de comando, sem servidor HTTP
+
+Executa CSVProcessor, DataService e FinancialPredictor no próprio processo,
+contra um banco local (SQLite por padrão) ou qualquer DATABASE_URL. O
+preditor treinado por `train` é gravado ao lado do banco e reaproveitado por
+`predict`, que só retreina se houver dados novos desde o último treino.
+
+Exemplos:
+    python -m app.cli ingest data/uploads/*.csv historico.zip
+    python -m app.cli train
+    python -m app.cli predict --todas
+    python -m app.cli export previsoes --saida data/previsoes.parquet
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+DEFAULT_DATABASE_URL = "sqlite:///data/financial_planner.db"
+DEFAULT_TUNING_BUDGET = 20.0
+DEFAULT_MODELS_PATH = "data/modelos.joblib"
+
+logger = logging.getLogger("app.cli")
+
+
+def _n_jobs(value: str) -> int:
+    """Valida --n-jobs: -1 (todos os núcleos) ou inteiro positivo"""
+    try:
+        n_jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"valor inválido: {value}")
+    if n_jobs != -1 and n_jobs < 1:
+        raise argparse.ArgumentTypeError("use -1 (todos os núcleos) ou um inteiro positivo")
+    return n_jobs
+
+
+def _read_input_files(paths):
+    """Lê CSVs e ZIPs de entrada como pares (nome, conteúdo)"""
+    from app.services.csv_processor import CSVProcessor
+    
+    files = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        if path.lower().endswith('.zip'):
+            files.extend(
+                (f"{os.path.basename(path)}/{name}", file_content)
+                for name, file_content in CSVProcessor.extract_zip(content)
+            )
+        elif path.lower().endswith('.csv'):
+            files.append((os.path.basename(path), content))
+        else:
+            raise ValueError(f"Formato não suportado: {path} (use .csv ou .zip)")
+    return files
+
+
+def cmd_ingest(args, db, data_service):
+    return data_service.ingest_files(db, _read_input_files(args.arquivos), max_workers=args.workers)
+
+
+def _models_path(args) -> str:
+    """Arquivo do preditor treinado: --modelos ou ao lado do banco SQLite"""
+    if args.modelos:
+        return args.modelos
+    if args.database_url.startswith("sqlite:///"):
+        return os.path.splitext(args.database_url[len("sqlite:///"):])[0] + ".modelos.joblib"
+    return DEFAULT_MODELS_PATH
+
+
+def cmd_train(args, db, data_service):
+    accuracy_scores = data_service.train_models(db, force_tuning=args.retunar)
+    data_service.predictor.save(_models_path(args))
+    return {"acuracia": accuracy_scores, "modelos": data_service.predictor.model_configs}
+
+
+def cmd_predict(args, db, data_service):
+    from app.services.predictor import FinancialPredictor
+    
+    if args.todas:
+        base_competencias = data_service.get_competencias(db)
+    elif args.competencia:
+        base_competencias = args.competencia
+    else:
+        latest_competencia = data_service.get_latest_competencia(db)
+        base_competencias = [latest_competencia] if latest_competencia else []
+    
+    if not base_competencias:
+        raise ValueError("Não há dados disponíveis")
+    
+    # Reaproveitar o preditor gravado por `train`; retreina (e regrava) só se há dados novos
+    models_path = _models_path(args)
+    if os.path.exists(models_path):
+        data_service.predictor = FinancialPredictor.load(models_path)
+    if data_service.needs_training(db):
+        data_service.train_models(db)
+        data_service.predictor.save(models_path)
+    
+    return data_service.generate_predictions_bulk(db, base_competencias)
+
+
+def cmd_export(args, db, data_service):
+    import pandas as pd
+    from app.models.database import PredictionHistory
+    
+    if args.tabela == 'dados':
+        df = pd.DataFrame(data_service.get_financial_data(db, args.inicio, args.fim))
+    else:
+        query = db.query(PredictionHistory)
+        if args.inicio:
+            query = query.filter(PredictionHistory.competencia_base >= args.inicio)
+        if args.fim:
+            query = query.filter(PredictionHistory.competencia_base <= args.fim)
+        query = query.order_by(PredictionHistory.competencia_base, PredictionHistory.tipo, PredictionHistory.periodo)
+        df = pd.read_sql(query.statement, db.bind)
+    
+    if args.saida.lower().endswith('.parquet'):
+        df.to_parquet(args.saida, index=False)
+    else:
+        df.to_csv(args.saida, index=False)
+    
+    return {"arquivo": args.saida, "registros_exportados": len(df)}
+
+
+def cmd_migrate(args, db, data_service):
+    from app.models.database import migrate_financial_data, convert_financial_data_to_partitioned
+    
+    migrate_financial_data(args.engine)
+    result = {"esquema_atualizado": True}
+    if args.particionar:
+        result["registros_copiados"] = convert_financial_data_to_partitioned(args.engine)
+    return result
+
+
+def cmd_archive(args, db, data_service):
+    return {"particao_arquivada": data_service.archive_year(db, args.ano)}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="Pipeline em lote do Sistema de Planejamento Financeiro"
+    )
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL),
+        help=f"URL do banco (padrão: DATABASE_URL ou {DEFAULT_DATABASE_URL})"
+    )
+    parser.add_argument(
+        "--modelos",
+        help="Arquivo do preditor treinado (padrão: ao lado do banco SQLite ou data/modelos.joblib)"
+    )
+    parser.add_argument(
+        "--n-jobs", type=_n_jobs, default=-1,
+        help="Processos/threads para parsing e treino (-1 = todos os núcleos)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    ingest = subparsers.add_parser("ingest", help="Carrega CSVs e ZIPs de CSVs")
+    ingest.add_argument("arquivos", nargs="+", help="Arquivos .csv ou .zip")
+    ingest.set_defaults(func=cmd_ingest)
+    
+    train = subparsers.add_parser("train", help="Treina os modelos com todos os dados")
+    train.add_argument(
+        "--orcamento", type=float, default=DEFAULT_TUNING_BUDGET,
+        help=f"Orçamento em segundos do tuning por série (padrão: {DEFAULT_TUNING_BUDGET:g}; 0 desabilita)"
+    )
+    train.add_argument("--retunar", action="store_true", help="Refaz o tuning mesmo com configuração em cache")
+    train.set_defaults(func=cmd_train)
+    
+    predict = subparsers.add_parser("predict", help="Gera e grava previsões de 30 e 60 dias")
+    group = predict.add_mutually_exclusive_group()
+    group.add_argument(
+        "--competencia", action="append",
+        help="Competência base YYYY-MM (pode repetir; padrão: a mais recente)"
+    )
+    group.add_argument("--todas", action="store_true", help="Usa todas as competências do banco como base")
+    predict.add_argument("--saida", help="Grava as previsões em JSON neste arquivo")
+    predict.set_defaults(func=cmd_predict)
+    
+    export = subparsers.add_parser("export", help="Exporta dados ou previsões para CSV/Parquet")
+    export.add_argument("tabela", choices=["dados", "previsoes"])
+    export.add_argument("--saida", required=True, help="Arquivo de saída (.csv ou .parquet)")
+    export.add_argument("--inicio", help="Competência inicial YYYY-MM")
+    export.add_argument("--fim", help="Competência final YYYY-MM")
+    export.set_defaults(func=cmd_export)
+    
+    migrate = subparsers.add_parser("migrate", help="Atualiza o esquema de financial_data (idempotente)")
+    migrate.add_argument(
+        "--particionar", action="store_true",
+        help="Converte a tabela para o layout particionado (requer FINANCIAL_DATA_STORAGE=partitioned)"
+    )
+    migrate.set_defaults(func=cmd_migrate)
+    
+    archive = subparsers.add_parser(
+        "archive", help="Desanexa a partição de um ano para arquivamento (modo particionado)"
+    )
+    archive.add_argument("--ano", type=int, required=True, help="Ano da partição a arquivar")
+    archive.set_defaults(func=cmd_archive)
+    
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    
+    # O engine é criado na importação de app.models.database
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.database_url.startswith("sqlite:///"):
+        db_dir = os.path.dirname(args.database_url[len("sqlite:///"):])
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+    
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models.database import Base, migrate_financial_data
+    from app.services.data_service import DataService
+    
+    # Engine próprio para a URL informada (o de app.models.database pode já ter
+    # sido criado com outra URL quando a CLI é chamada de dentro de um processo)
+    args.engine = create_engine(args.database_url, pool_pre_ping=True)
+    Base.metadata.create_all(bind=args.engine)
+    migrate_financial_data(args.engine)
+    
+    # Número de workers usado tanto no parsing quanto no treino
+    args.workers = (os.cpu_count() or 1) if args.n_jobs == -1 else args.n_jobs
+    data_service = DataService(n_jobs=args.workers, tuning_budget=getattr(args, "orcamento", None))
+    db = sessionmaker(autocommit=False, autoflush=False, bind=args.engine)()
+    try:
+        result = args.func(args, db, data_service)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro no comando {args.command}: {str(e)}")
+        return 1
+    finally:
+        db.close()
+        args.engine.dispose()
+    
+    output = json.dumps(result, ensure_ascii=False, indent=2, default=str)
+    if getattr(args, "saida", None) and args.command == "predict":
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
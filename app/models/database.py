@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, create_engine, Index, text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, JSON, create_engine, Index, inspect, text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import sessionmaker, validates
+from datetime import date, datetime
+from typing import Iterable, List
 import os
 
 # Configuração do PostgreSQL/Supabase
@@ -13,22 +15,47 @@ engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Modo de armazenamento de financial_data: "standard" (tabela única) ou
+# "partitioned" (particionamento declarativo por ano, apenas PostgreSQL).
+# Em outros bancos (ex.: SQLite nos testes) sempre cai para o modo standard.
+STORAGE_MODE = os.getenv("FINANCIAL_DATA_STORAGE", "standard").lower()
+PARTITIONED_STORAGE = STORAGE_MODE == "partitioned" and engine.dialect.name == "postgresql"
+
+def competencia_to_date(competencia: str) -> date:
+    """Converte uma competência YYYY-MM para o primeiro dia do mês"""
+    year, month = competencia.split('-')
+    return date(int(year), int(month), 1)
+
+_financial_data_args = (
+    # Índices compostos para otimização
+    Index('idx_competencia_tipo', 'competencia', 'tipo'),
+    Index('idx_tipo_categoria', 'tipo', 'categoria'),
+    # BRIN nas colunas temporais (os dados chegam em ordem cronológica)
+    Index('idx_competencia_data_brin', 'competencia_data', postgresql_using='brin'),
+    Index('idx_created_at_brin', 'created_at', postgresql_using='brin'),
+)
+if PARTITIONED_STORAGE:
+    _financial_data_args += ({'postgresql_partition_by': 'RANGE (competencia_data)'},)
+
 class FinancialData(Base):
     __tablename__ = "financial_data"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # No modo particionado a chave de partição precisa fazer parte da PK
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     competencia = Column(String(7), index=True, nullable=False)  # YYYY-MM
+    competencia_data = Column(Date, primary_key=PARTITIONED_STORAGE, nullable=False)  # Primeiro dia do mês
     tipo = Column(String(10), nullable=False)  # receita | custo
     categoria = Column(String(100), nullable=False)
     valor = Column(Float, nullable=False)
     descricao = Column(String(500))
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Índices compostos para otimização
-    __table_args__ = (
-        Index('idx_competencia_tipo', 'competencia', 'tipo'),
-        Index('idx_tipo_categoria', 'tipo', 'categoria'),
-    )
+    __table_args__ = _financial_data_args
+    
+    @validates('competencia')
+    def _sync_competencia_data(self, key, value):
+        self.competencia_data = competencia_to_date(value)
+        return value
 
 class PredictionHistory(Base):
     __tablename__ = "prediction_history"
@@ -54,9 +81,152 @@ class PredictionHistory(Base):
         UniqueConstraint('competencia_base', 'tipo', 'periodo', name='uq_prediction_unique'),
     )
 
+class IngestedFile(Base):
+    __tablename__ = "ingested_files"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    checksum = Column(String(64), nullable=False, unique=True)  # SHA-256 do conteúdo
+    nome_arquivo = Column(String(255), nullable=False)
+    registros_processados = Column(Integer, nullable=False)
+    registros_salvos = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ModelConfig(Base):
+    __tablename__ = "model_configs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(10), nullable=False)  # receita | custo
+    categoria = Column(String(100), nullable=False, default='')  # '' = série agregada do tipo
+    familia = Column(String(50), nullable=False)  # random_forest | extra_trees | gradient_boosting | ridge
+    params = Column(JSON, nullable=False)
+    score = Column(Float)  # MAPE médio na validação temporal
+    
+    # Resumo da série usada no tuning, para detectar mudanças relevantes
+    n_amostras = Column(Integer, nullable=False)
+    media = Column(Float, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('tipo', 'categoria', name='uq_model_config'),
+    )
+
+def _is_partitioned_table(conn, table_name: str = "financial_data") -> bool:
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {'name': table_name}
+    ).scalar() == 'p'
+
+def migrate_financial_data(bind=engine) -> None:
+    """Atualiza uma financial_data existente para o esquema atual (idempotente)
+    
+    Adiciona e preenche competencia_data em tabelas criadas antes dela e
+    cria os índices que faltarem (create_all não altera tabelas existentes).
+    """
+    with bind.begin() as conn:
+        columns = {column['name']: column for column in inspect(conn).get_columns('financial_data')}
+        column = columns.get('competencia_data')
+        
+        if bind.dialect.name == 'postgresql':
+            if column is None or column['nullable']:
+                conn.execute(text("ALTER TABLE financial_data ADD COLUMN IF NOT EXISTS competencia_data DATE"))
+                conn.execute(text(
+                    "UPDATE financial_data SET competencia_data = to_date(competencia || '-01', 'YYYY-MM-DD') "
+                    "WHERE competencia_data IS NULL"
+                ))
+                conn.execute(text("ALTER TABLE financial_data ALTER COLUMN competencia_data SET NOT NULL"))
+            if PARTITIONED_STORAGE and not _is_partitioned_table(conn):
+                print("Aviso: financial_data não está particionada; execute 'python -m app.cli migrate --particionar'")
+        elif column is None:
+            # SQLite não suporta ADD COLUMN IF NOT EXISTS nem SET NOT NULL
+            conn.execute(text("ALTER TABLE financial_data ADD COLUMN competencia_data DATE"))
+            conn.execute(text("UPDATE financial_data SET competencia_data = competencia || '-01'"))
+        
+        for index in FinancialData.__table__.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+def convert_financial_data_to_partitioned(bind=engine) -> int:
+    """Converte uma financial_data comum para o layout particionado por ano
+    
+    Em uma única transação: renomeia a tabela atual, cria a tabela
+    particionada e as partições dos anos existentes, copia os dados e
+    remove a tabela antiga. Retorna o número de registros copiados
+    (0 se a tabela já estava particionada).
+    """
+    if not PARTITIONED_STORAGE:
+        raise ValueError("Conversão disponível apenas com FINANCIAL_DATA_STORAGE=partitioned (PostgreSQL)")
+    
+    migrate_financial_data(bind)
+    
+    with bind.begin() as conn:
+        if _is_partitioned_table(conn):
+            return 0
+        
+        conn.execute(text("ALTER TABLE financial_data RENAME TO financial_data_legado"))
+        # Liberar os nomes da PK e dos índices para a nova tabela
+        conn.execute(text(
+            "ALTER TABLE financial_data_legado RENAME CONSTRAINT financial_data_pkey TO financial_data_legado_pkey"
+        ))
+        for index in FinancialData.__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        
+        FinancialData.__table__.create(bind=conn)
+        years = conn.execute(text(
+            "SELECT DISTINCT EXTRACT(YEAR FROM competencia_data)::int FROM financial_data_legado"
+        )).scalars().all()
+        ensure_financial_data_partitions(conn, years)
+        
+        copied = conn.execute(text(
+            "INSERT INTO financial_data (id, competencia, competencia_data, tipo, categoria, valor, descricao, created_at) "
+            "SELECT id, competencia, competencia_data, tipo, categoria, valor, descricao, created_at "
+            "FROM financial_data_legado"
+        )).rowcount
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('financial_data', 'id'), "
+            "COALESCE((SELECT MAX(id) FROM financial_data), 0) + 1, false)"
+        ))
+        conn.execute(text("DROP TABLE financial_data_legado"))
+    
+    return copied
+
+def partition_name(year: int) -> str:
+    return f"financial_data_y{year}"
+
+def ensure_financial_data_partitions(db, years: Iterable[int]) -> List[str]:
+    """Cria (se necessário) as partições anuais de financial_data"""
+    if not PARTITIONED_STORAGE:
+        return []
+    
+    created = []
+    for year in sorted(set(years)):
+        name = partition_name(year)
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF financial_data "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+        created.append(name)
+    return created
+
+def detach_financial_data_partition(db, year: int) -> str:
+    """Desanexa a partição de um ano para arquivamento
+    
+    A partição continua existindo como tabela comum, renomeada para
+    financial_data_yYYYY_arquivo, e deixa de ser lida pelas consultas.
+    """
+    if not PARTITIONED_STORAGE:
+        raise ValueError("Arquivamento por partição disponível apenas no modo particionado (PostgreSQL)")
+    
+    name = partition_name(year)
+    archived_name = f"{name}_arquivo"
+    db.execute(text(f"ALTER TABLE financial_data DETACH PARTITION {name}"))
+    db.execute(text(f"ALTER TABLE {name} RENAME TO {archived_name}"))
+    db.commit()
+    return archived_name
+
 # Criar tabelas (com tratamento de erro para produção)
 try:
     Base.metadata.create_all(bind=engine)
+    migrate_financial_data(engine)
 except Exception as e:
     print(f"Aviso: Erro ao criar tabelas (podem já existir): {e}")
 
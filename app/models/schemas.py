@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import re
 
@@ -16,6 +16,8 @@ class FinancialDataCreate(BaseModel):
     def validate_competencia(cls, v):
         if not re.match(r'^\d{4}-\d{2}$', v):
             raise ValueError('Competência deve estar no formato YYYY-MM')
+        if not 1 <= int(v[5:7]) <= 12:
+            raise ValueError('Mês da competência deve estar entre 01 e 12')
         return v
     
     @field_validator('tipo')
@@ -72,7 +74,8 @@ class HealthResponse(BaseModel):
 
 # --- Model Stats Schema ---
 class ModelStatsResponse(BaseModel):
-    modelo_ativo: str
+    modelo_ativo: str  # ex.: "receita: ridge, custo: random_forest"
+    modelos: Dict[str, str] = {}  # família do modelo por tipo
     total_previsoes: int
     acuracia_media: float
     ultima_atualizacao: datetime
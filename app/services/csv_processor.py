@@ -1,7 +1,16 @@
 import pandas as pd
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 from app.models.schemas import FinancialDataCreate
+import hashlib
 import io
+import os
+import zipfile
+
+# Limites de descompactação para proteger a memória contra ZIPs maliciosos
+MAX_ZIP_MEMBERS = 500
+MAX_ZIP_MEMBER_SIZE = 50 * 1024 * 1024  # 50 MB por CSV
+MAX_ZIP_TOTAL_SIZE = 500 * 1024 * 1024  # 500 MB no total
 
 class CSVProcessor:
     
@@ -56,4 +65,71 @@ class CSVProcessor:
             return financial_data
             
         except Exception as e:
-            raise ValueError(f"Erro ao processar CSV: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Erro ao processar CSV: {str(e)}")
+    
+    @staticmethod
+    def compute_checksum(file_content: bytes) -> str:
+        """Calcula o checksum SHA-256 do conteúdo do arquivo"""
+        return hashlib.sha256(file_content).hexdigest()
+    
+    @staticmethod
+    def extract_zip(file_content: bytes) -> List[Tuple[str, bytes]]:
+        """Extrai os CSVs de um arquivo ZIP, ordenados pelo nome"""
+        try:
+            with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir()
+                    and not info.filename.startswith('__MACOSX/')
+                    and info.filename.lower().endswith('.csv')
+                ]
+                if len(members) > MAX_ZIP_MEMBERS:
+                    raise ValueError(f"ZIP contém mais de {MAX_ZIP_MEMBERS} arquivos CSV")
+                
+                # Validar tamanhos declarados antes de descompactar qualquer arquivo
+                for info in members:
+                    if info.file_size > MAX_ZIP_MEMBER_SIZE:
+                        raise ValueError(f"{info.filename}: arquivo excede o tamanho máximo descompactado")
+                if sum(info.file_size for info in members) > MAX_ZIP_TOTAL_SIZE:
+                    raise ValueError("ZIP excede o tamanho máximo descompactado")
+                
+                files = []
+                total_size = 0
+                for info in members:
+                    # Ler com limite: o tamanho declarado no cabeçalho pode ser falso
+                    with archive.open(info) as member:
+                        content = member.read(MAX_ZIP_MEMBER_SIZE + 1)
+                    total_size += len(content)
+                    if len(content) > MAX_ZIP_MEMBER_SIZE or total_size > MAX_ZIP_TOTAL_SIZE:
+                        raise ValueError(f"{info.filename}: arquivo excede o tamanho máximo descompactado")
+                    files.append((info.filename, content))
+        except zipfile.BadZipFile:
+            raise ValueError("Arquivo ZIP inválido")
+        
+        if not files:
+            raise ValueError("ZIP não contém arquivos CSV")
+        
+        return sorted(files, key=lambda item: item[0])
+    
+    @staticmethod
+    def process_many(files: List[Tuple[str, bytes]], max_workers: Optional[int] = None) -> List[List[FinancialDataCreate]]:
+        """Processa vários CSVs em paralelo, um processo por arquivo"""
+        # Para um único arquivo não compensa subir um pool de processos
+        if len(files) <= 1:
+            return [CSVProcessor._process_named_csv(name, content) for name, content in files]
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(files))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(CSVProcessor._process_named_csv, name, content)
+                for name, content in files
+            ]
+            return [future.result() for future in futures]
+    
+    @staticmethod
+    def _process_named_csv(name: str, file_content: bytes) -> List[FinancialDataCreate]:
+        """Processa um CSV identificando o arquivo nas mensagens de erro"""
+        try:
+            return CSVProcessor.process_csv(file_content)
+        except ValueError as e:
+            raise ValueError(f"{name}: {str(e)}")
@@ -1,25 +1,41 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.models.database import FinancialData, PredictionHistory
+from app.models.database import (
+    FinancialData, PredictionHistory, IngestedFile, ModelConfig,
+    competencia_to_date, ensure_financial_data_partitions, detach_financial_data_partition
+)
 from app.models.schemas import FinancialDataCreate
+from app.services.csv_processor import CSVProcessor
 from app.services.predictor import FinancialPredictor
-from typing import List, Dict
+from app.services.model_tuner import MIN_SAMPLES_FOR_TUNING, ModelTuner
+from typing import List, Dict, Iterable, Optional, Set, Tuple
 from datetime import datetime
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# Orçamento (segundos) do tuning de cada série; 0 desabilita o tuning.
+# Desabilitado por padrão na API (o treino roda no caminho da requisição):
+# o tuning é feito pela CLI e a API reaproveita as configurações em cache.
+MODEL_TUNING_BUDGET = float(os.getenv("MODEL_TUNING_BUDGET", "0"))
+
 class DataService:
     
-    def __init__(self):
-        self.predictor = FinancialPredictor()
+    def __init__(self, n_jobs: Optional[int] = None, tuning_budget: Optional[float] = None):
+        self.predictor = FinancialPredictor(n_jobs=n_jobs)
+        self.tuning_budget = MODEL_TUNING_BUDGET if tuning_budget is None else tuning_budget
+        self.tuner = ModelTuner(budget_seconds=self.tuning_budget, n_jobs=-1 if n_jobs is None else n_jobs)
     
     def save_financial_data(self, db: Session, data_list: List[FinancialDataCreate]) -> int:
         """Salva dados financeiros no banco"""
         saved_count = 0
+        ensure_financial_data_partitions(db, {int(data.competencia[:4]) for data in data_list})
         
         for data in data_list:
-            # Verificar se já existe
+            # Verificar se já existe (filtrando pela data para podar partições)
             existing = db.query(FinancialData).filter(
+                FinancialData.competencia_data == competencia_to_date(data.competencia),
                 FinancialData.competencia == data.competencia,
                 FinancialData.tipo == data.tipo,
                 FinancialData.categoria == data.categoria,
@@ -34,9 +50,122 @@ class DataService:
         db.commit()
         return saved_count
     
+    def get_ingested_checksums(self, db: Session, checksums: Iterable[str]) -> Set[str]:
+        """Retorna os checksums que já foram ingeridos"""
+        checksums = list(checksums)
+        if not checksums:
+            return set()
+        
+        rows = db.query(IngestedFile.checksum).filter(IngestedFile.checksum.in_(checksums)).all()
+        return {row.checksum for row in rows}
+    
+    def save_financial_data_bulk(
+        self,
+        db: Session,
+        files: List[Tuple[str, str, List[FinancialDataCreate]]]
+    ) -> List[int]:
+        """Salva os dados de vários arquivos em lote, com um único commit
+        
+        Cada item de `files` é uma tupla (nome_arquivo, checksum, dados).
+        Retorna a quantidade de registros salvos por arquivo, na mesma ordem
+        de `files` (nomes podem se repetir entre diretórios).
+        """
+        competencias = {data.competencia for _, _, data_list in files for data in data_list}
+        competencia_dates = {competencia: competencia_to_date(competencia) for competencia in competencias}
+        ensure_financial_data_partitions(db, {value.year for value in competencia_dates.values()})
+        
+        # Carregar de uma vez as chaves já existentes nas competências do lote
+        existing_keys = set()
+        if competencias:
+            rows = db.query(
+                FinancialData.competencia,
+                FinancialData.tipo,
+                FinancialData.categoria,
+                FinancialData.descricao
+            ).filter(FinancialData.competencia_data.in_(set(competencia_dates.values()))).all()
+            existing_keys = {tuple(row) for row in rows}
+        
+        saved_counts = []
+        new_rows = []
+        
+        for nome_arquivo, checksum, data_list in files:
+            saved_count = 0
+            for data in data_list:
+                # Como em save_financial_data, deduplica só contra o que já está no
+                # banco: linhas iguais no mesmo lote são lançamentos distintos
+                key = (data.competencia, data.tipo, data.categoria, data.descricao)
+                if key in existing_keys:
+                    continue
+                new_rows.append({**data.dict(), 'competencia_data': competencia_dates[data.competencia]})
+                saved_count += 1
+            
+            saved_counts.append(saved_count)
+            db.add(IngestedFile(
+                checksum=checksum,
+                nome_arquivo=nome_arquivo,
+                registros_processados=len(data_list),
+                registros_salvos=saved_count
+            ))
+        
+        if new_rows:
+            db.bulk_insert_mappings(FinancialData, new_rows)
+        
+        db.commit()
+        return saved_counts
+    
+    def ingest_files(self, db: Session, files: List[Tuple[str, bytes]], max_workers: Optional[int] = None) -> Dict:
+        """Ingere vários CSVs (nome, conteúdo) de uma vez
+        
+        Ignora arquivos já ingeridos (mesmo checksum), inclusive repetidos na
+        entrada, processa os pendentes em paralelo e salva tudo em lote.
+        """
+        files = [(name, CSVProcessor.compute_checksum(content), content) for name, content in files]
+        seen_checksums = self.get_ingested_checksums(db, [checksum for _, checksum, _ in files])
+        
+        pending = []
+        skipped = []
+        for name, checksum, content in files:
+            if checksum in seen_checksums:
+                skipped.append(name)
+                continue
+            seen_checksums.add(checksum)
+            pending.append((name, checksum, content))
+        
+        parsed = CSVProcessor.process_many([(name, content) for name, _, content in pending], max_workers=max_workers)
+        saved_counts = self.save_financial_data_bulk(
+            db,
+            [(name, checksum, financial_data) for (name, checksum, _), financial_data in zip(pending, parsed)]
+        )
+        
+        return {
+            "arquivos_processados": [name for name, _, _ in pending],
+            "arquivos_ignorados": skipped,
+            "registros_processados": sum(len(financial_data) for financial_data in parsed),
+            "registros_salvos": sum(saved_counts)
+        }
+    
     def get_all_financial_data(self, db: Session) -> List[Dict]:
         """Recupera todos os dados financeiros"""
-        data = db.query(FinancialData).all()
+        return self.get_financial_data(db)
+    
+    def get_financial_data(
+        self,
+        db: Session,
+        start_competencia: Optional[str] = None,
+        end_competencia: Optional[str] = None
+    ) -> List[Dict]:
+        """Recupera os dados financeiros de um intervalo de competências (inclusivo)
+        
+        O filtro é feito sobre competencia_data, permitindo a poda de
+        partições no modo particionado.
+        """
+        query = db.query(FinancialData)
+        if start_competencia:
+            query = query.filter(FinancialData.competencia_data >= competencia_to_date(start_competencia))
+        if end_competencia:
+            query = query.filter(FinancialData.competencia_data <= competencia_to_date(end_competencia))
+        
+        data = query.order_by(FinancialData.competencia_data).all()
         return [
             {
                 'competencia': item.competencia,
@@ -48,67 +177,168 @@ class DataService:
             for item in data
         ]
     
-    def train_models(self, db: Session) -> Dict[str, float]:
+    def get_latest_competencia(self, db: Session) -> Optional[str]:
+        """Competência mais recente disponível no banco"""
+        latest = db.query(func.max(FinancialData.competencia_data)).scalar()
+        return latest.strftime('%Y-%m') if latest else None
+    
+    def get_competencias(self, db: Session) -> List[str]:
+        """Competências distintas disponíveis no banco, em ordem cronológica"""
+        rows = db.query(FinancialData.competencia_data).distinct().order_by(FinancialData.competencia_data).all()
+        return [row.competencia_data.strftime('%Y-%m') for row in rows]
+    
+    def archive_year(self, db: Session, year: int) -> str:
+        """Desanexa a partição de um ano (modo particionado) para arquivamento"""
+        return detach_financial_data_partition(db, year)
+    
+    def needs_training(self, db: Session) -> bool:
+        """Indica se há dados gravados depois do último treino (ou se nunca treinou)"""
+        if not self.predictor.is_trained:
+            return True
+        last_created_at = db.query(func.max(FinancialData.created_at)).scalar()
+        return last_created_at is not None and last_created_at > self.predictor.last_training_date
+    
+    def train_models(self, db: Session, force_tuning: bool = False) -> Dict[str, float]:
         """Treina os modelos com todos os dados disponíveis"""
         financial_data = self.get_all_financial_data(db)
-        return self.predictor.train(financial_data)
+        model_configs = self.get_model_configs(db, financial_data, force_tuning) if financial_data else {}
+        return self.predictor.train(financial_data, model_configs)
+    
+    def get_model_configs(self, db: Session, financial_data: List[Dict], force_tuning: bool = False) -> Dict[str, Dict]:
+        """Configurações de modelo por tipo, reaproveitando o cache
+        
+        Só refaz o tuning quando não há configuração salva ou quando a série
+        mudou materialmente (quantidade de meses ou média).
+        """
+        cached_configs = {
+            item.tipo: item
+            for item in db.query(ModelConfig).filter(ModelConfig.categoria == '').all()
+        }
+        
+        model_configs = {}
+        tuned = False
+        for tipo, df_tipo in self.predictor.build_training_series(financial_data).items():
+            cached = cached_configs.get(tipo)
+            cached_dict = {'n_amostras': cached.n_amostras, 'media': cached.media, 'score': cached.score} if cached else None
+            y = df_tipo['valor']
+            
+            if self.tuning_budget <= 0 or y.empty:
+                if cached:
+                    model_configs[tipo] = {'familia': cached.familia, 'params': cached.params}
+                continue
+            
+            if not force_tuning and not self.tuner.needs_retuning(cached_dict, y):
+                model_configs[tipo] = {'familia': cached.familia, 'params': cached.params}
+                continue
+            
+            config = self.tuner.tune(df_tipo[self.predictor.FEATURE_COLUMNS], y)
+            logger.info(f"Tuning de {tipo}: {config['familia']} {config['params']} (MAPE {config['score']})")
+            
+            # Orçamento esgotado antes de concluir a primeira rodada: não grava o
+            # padrão como se fosse resultado de tuning (o cache anterior é mantido)
+            if config['score'] is None and len(y) >= MIN_SAMPLES_FOR_TUNING:
+                logger.warning(f"Tuning de {tipo} não concluiu dentro do orçamento; configuração não salva")
+                model_configs[tipo] = (
+                    {'familia': cached.familia, 'params': cached.params} if cached
+                    else {'familia': config['familia'], 'params': config['params']}
+                )
+                continue
+            
+            if not cached:
+                cached = ModelConfig(tipo=tipo, categoria='')
+                db.add(cached)
+            cached.familia = config['familia']
+            cached.params = config['params']
+            cached.score = config['score']
+            cached.n_amostras = config['n_amostras']
+            cached.media = config['media']
+            cached.created_at = datetime.utcnow()
+            tuned = True
+            
+            model_configs[tipo] = {'familia': config['familia'], 'params': config['params']}
+        
+        if tuned:
+            db.commit()
+        
+        return model_configs
     
     def generate_predictions(self, db: Session, base_competencia: str) -> Dict:
         """Gera previsões para 30 e 60 dias"""
+        return self.generate_predictions_bulk(db, [base_competencia])[base_competencia]
+    
+    def generate_predictions_bulk(self, db: Session, base_competencias: List[str]) -> Dict[str, Dict]:
+        """Gera previsões de 30 e 60 dias para várias competências base
+        
+        O histórico é gravado em lote: uma consulta para as previsões já
+        existentes e um único commit ao final.
+        """
         # Treinar modelo se não estiver treinado
         if not self.predictor.is_trained:
             self.train_models(db)
         
-        predictions = self.predictor.predict_future(base_competencia, [30, 60])
+        base_competencias = list(dict.fromkeys(base_competencias))
+        predictions_by_base = {
+            base_competencia: self.predictor.predict_future(base_competencia, [30, 60])
+            for base_competencia in base_competencias
+        }
+        
+        # Previsões já existentes para as competências/tipos/períodos do lote
+        existing_predictions = {
+            (item.competencia_base, item.tipo, item.periodo): item
+            for item in db.query(PredictionHistory).filter(
+                PredictionHistory.competencia_base.in_(base_competencias)
+            ).all()
+        }
         
         # Salvar histórico de previsões (evitando duplicatas)
-        for key, pred in predictions.items():
-            tipo = key.split('_')[0]
-            periodo = int(key.split('_')[1].replace('d', ''))
-            
-            # Verificar se já existe previsão para esta competência/tipo/período
-            existing_prediction = db.query(PredictionHistory).filter(
-                PredictionHistory.competencia_base == base_competencia,
-                PredictionHistory.tipo == tipo,
-                PredictionHistory.periodo == periodo
-            ).first()
-            
-            if existing_prediction:
-                # Atualizar previsão existente
-                existing_prediction.valor_previsto = pred['valor_previsto']
-                existing_prediction.intervalo_min = pred['intervalo_confianca'][0]
-                existing_prediction.intervalo_max = pred['intervalo_confianca'][1]
-                existing_prediction.modelo_usado = pred['modelo_usado']
-                existing_prediction.acuracia_absoluta = float(pred.get('acuracia_historica', {}).get('r2', 0.0))
-                existing_prediction.acuracia_relativa = float(pred.get('acuracia_historica', {}).get('mape', 0.0))
-                existing_prediction.created_at = datetime.utcnow()
-            else:
-                # Criar nova previsão
+        new_records = []
+        for base_competencia, predictions in predictions_by_base.items():
+            for key, pred in predictions.items():
+                tipo = key.split('_')[0]
+                periodo = int(key.split('_')[1].replace('d', ''))
                 acuracia_dict = pred.get('acuracia_historica', {})
-                prediction_record = PredictionHistory(
-                    competencia_base=base_competencia,
-                    tipo=tipo,
-                    periodo=periodo,
-                    valor_previsto=pred['valor_previsto'],
-                    intervalo_min=pred['intervalo_confianca'][0],
-                    intervalo_max=pred['intervalo_confianca'][1],
-                    modelo_usado=pred['modelo_usado'],
-                    acuracia_absoluta=float(acuracia_dict.get('r2', 0.0)),
-                    acuracia_relativa=float(acuracia_dict.get('mape', 0.0))
-                )
-                db.add(prediction_record)
+                
+                existing_prediction = existing_predictions.get((base_competencia, tipo, periodo))
+                if existing_prediction:
+                    # Atualizar previsão existente
+                    existing_prediction.valor_previsto = pred['valor_previsto']
+                    existing_prediction.intervalo_min = pred['intervalo_confianca'][0]
+                    existing_prediction.intervalo_max = pred['intervalo_confianca'][1]
+                    existing_prediction.modelo_usado = pred['modelo_usado']
+                    existing_prediction.acuracia_absoluta = float(acuracia_dict.get('r2', 0.0))
+                    existing_prediction.acuracia_relativa = float(acuracia_dict.get('mape', 0.0))
+                    existing_prediction.created_at = datetime.utcnow()
+                else:
+                    # Criar nova previsão
+                    new_records.append({
+                        'competencia_base': base_competencia,
+                        'tipo': tipo,
+                        'periodo': periodo,
+                        'valor_previsto': pred['valor_previsto'],
+                        'intervalo_min': pred['intervalo_confianca'][0],
+                        'intervalo_max': pred['intervalo_confianca'][1],
+                        'modelo_usado': pred['modelo_usado'],
+                        'acuracia_absoluta': float(acuracia_dict.get('r2', 0.0)),
+                        'acuracia_relativa': float(acuracia_dict.get('mape', 0.0))
+                    })
+        
+        if new_records:
+            db.bulk_insert_mappings(PredictionHistory, new_records)
         
         db.commit()
         
+        total_registros = db.query(FinancialData).count()
         return {
-            'receita_30d': predictions['receita_30d'],
-            'custos_30d': predictions['custo_30d'],
-            'receita_60d': predictions['receita_60d'],
-            'custos_60d': predictions['custo_60d'],
-            'data_base': base_competencia,
-            'total_registros': len(self.get_all_financial_data(db))
+            base_competencia: {
+                'receita_30d': predictions['receita_30d'],
+                'custos_30d': predictions['custo_30d'],
+                'receita_60d': predictions['receita_60d'],
+                'custos_60d': predictions['custo_60d'],
+                'data_base': base_competencia,
+                'total_registros': total_registros
+            }
+            for base_competencia, predictions in predictions_by_base.items()
         }
-
     
     def get_database_stats(self, db: Session) -> Dict:
         """Estatísticas do banco de dados"""
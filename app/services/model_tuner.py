@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from itertools import product
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_percentage_error
+from sklearn.model_selection import TimeSeriesSplit
+from typing import Dict, List, Optional
+import math
+import time
+
+# Famílias de modelo e grades de hiperparâmetros avaliadas na busca
+MODEL_FAMILIES = {
+    'random_forest': (RandomForestRegressor, {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [None, 3, 6],
+        'min_samples_leaf': [1, 2],
+    }),
+    'extra_trees': (ExtraTreesRegressor, {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 4],
+        'min_samples_leaf': [1, 2],
+    }),
+    'gradient_boosting': (GradientBoostingRegressor, {
+        'n_estimators': [50, 100, 200],
+        'learning_rate': [0.05, 0.1],
+        'max_depth': [2, 3],
+    }),
+    'ridge': (Ridge, {
+        'alpha': [0.1, 1.0, 10.0],
+    }),
+}
+
+# Configuração usada quando não há tuning (série curta ou tuning desabilitado)
+DEFAULT_CONFIG = {'familia': 'random_forest', 'params': {'n_estimators': 100}}
+
+# Séries menores que isso não têm pontos suficientes para validação temporal
+MIN_SAMPLES_FOR_TUNING = 6
+
+# Mudança relativa a partir da qual os dados são considerados "materialmente" diferentes
+RETUNE_SAMPLES_CHANGE = 0.2
+RETUNE_MEAN_CHANGE = 0.25
+
+
+def build_model(familia: str, params: Dict, n_jobs: Optional[int] = None):
+    """Instancia um modelo da família com os hiperparâmetros informados"""
+    model_class, _ = MODEL_FAMILIES[familia]
+    params = dict(params)
+    if familia in ('random_forest', 'extra_trees'):
+        params['n_jobs'] = n_jobs
+    if familia != 'ridge':
+        params['random_state'] = 42
+    return model_class(**params)
+
+
+def _evaluate_candidate(candidate: Dict, X: pd.DataFrame, y: pd.Series, splits: List, deadline: float) -> Optional[float]:
+    """MAPE médio do candidato nas janelas de validação (None se o orçamento acabou)"""
+    errors = []
+    for train_idx, test_idx in splits:
+        if time.time() > deadline:
+            return None
+        model = build_model(candidate['familia'], candidate['params'], n_jobs=1)
+        model.fit(X.iloc[train_idx], y.iloc[train_idx])
+        y_pred = model.predict(X.iloc[test_idx])
+        errors.append(mean_absolute_percentage_error(y.iloc[test_idx], y_pred))
+    return float(np.mean(errors))
+
+
+class ModelTuner:
+    """Busca por successive halving sobre famílias de modelo e hiperparâmetros
+
+    O recurso que cresce a cada rodada é o número de janelas de validação
+    temporal (TimeSeriesSplit), começando pelas mais recentes. Os candidatos
+    de cada rodada são avaliados em paralelo e só a melhor fração 1/eta segue.
+    """
+
+    def __init__(self, budget_seconds: float = 20.0, n_jobs: Optional[int] = -1, eta: int = 3, max_splits: int = 5):
+        self.budget_seconds = budget_seconds
+        self.n_jobs = n_jobs
+        self.eta = eta
+        self.max_splits = max_splits
+
+    @staticmethod
+    def candidates() -> List[Dict]:
+        """Todas as combinações de família e hiperparâmetros"""
+        candidates = []
+        for familia, (_, grid) in MODEL_FAMILIES.items():
+            keys = list(grid.keys())
+            for values in product(*(grid[key] for key in keys)):
+                candidates.append({'familia': familia, 'params': dict(zip(keys, values))})
+        return candidates
+
+    @staticmethod
+    def needs_retuning(cached: Optional[Dict], y: pd.Series) -> bool:
+        """Indica se a série mudou o suficiente para invalidar a configuração em cache"""
+        if not cached:
+            return True
+
+        # Configuração sem score em série tunável: o tuning anterior não concluiu
+        if cached.get('score') is None and len(y) >= MIN_SAMPLES_FOR_TUNING:
+            return True
+
+        cached_samples = cached.get('n_amostras') or 0
+        cached_mean = cached.get('media') or 0.0
+        if cached_samples <= 0 or cached_mean <= 0:
+            return True
+
+        samples_change = abs(len(y) - cached_samples) / cached_samples
+        mean_change = abs(float(y.mean()) - cached_mean) / cached_mean
+        return samples_change >= RETUNE_SAMPLES_CHANGE or mean_change >= RETUNE_MEAN_CHANGE
+
+    def tune(self, X: pd.DataFrame, y: pd.Series) -> Dict:
+        """Escolhe a melhor configuração para a série dentro do orçamento de tempo"""
+        X = X.reset_index(drop=True)
+        y = y.reset_index(drop=True)
+        summary = {'n_amostras': len(y), 'media': float(y.mean())}
+
+        if len(y) < MIN_SAMPLES_FOR_TUNING:
+            return {**DEFAULT_CONFIG, 'score': None, **summary}
+
+        n_splits = min(self.max_splits, len(y) // 2)
+        # Janelas mais recentes primeiro: as primeiras rodadas validam no período mais próximo da previsão
+        all_splits = list(TimeSeriesSplit(n_splits=n_splits).split(X))[::-1]
+
+        deadline = time.time() + self.budget_seconds
+        remaining = self.candidates()
+        best = None
+        n_folds = 1
+
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            while remaining and time.time() < deadline:
+                splits = all_splits[:n_folds]
+                scores = parallel(
+                    delayed(_evaluate_candidate)(candidate, X, y, splits, deadline)
+                    for candidate in remaining
+                )
+                # Rodada interrompida pelo orçamento: mantém o vencedor da rodada anterior,
+                # pois só uma parte (arbitrária) dos candidatos foi avaliada
+                if any(score is None for score in scores):
+                    break
+
+                scored = sorted(zip(scores, remaining), key=lambda item: item[0])
+                best = {**scored[0][1], 'score': scored[0][0]}
+                if len(scored) == 1 or n_folds >= len(all_splits):
+                    break
+
+                keep = max(1, math.ceil(len(scored) / self.eta))
+                remaining = [candidate for _, candidate in scored[:keep]]
+                n_folds = min(n_folds * self.eta, len(all_splits))
+
+        if best is None:
+            return {**DEFAULT_CONFIG, 'score': None, **summary}
+        return {**best, **summary}
@@ -3,18 +3,27 @@ import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score, mean_absolute_percentage_error
 from sklearn.preprocessing import LabelEncoder
-from typing import Dict, List
+from app.services.model_tuner import DEFAULT_CONFIG, build_model
+from typing import Dict, List, Optional
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+import joblib
 
 
 class FinancialPredictor:
     
-    def __init__(self):
+    FEATURE_COLUMNS = ['year', 'month', 'quarter',
+                       'months_since_start', 'month_sin', 'month_cos']
+    
+    def __init__(self, n_jobs: Optional[int] = None):
+        # n_jobs=-1 usa todos os núcleos no treino e na previsão
+        self.n_jobs = n_jobs
         self.models = {
-            'receita': RandomForestRegressor(n_estimators=100, random_state=42),
-            'custo': RandomForestRegressor(n_estimators=100, random_state=42)
+            'receita': RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs),
+            'custo': RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
         }
+        self.model_configs = {}
+        self.training_start_date = None
         self.label_encoders = {}
         self.is_trained = False
         self.last_training_date = None
@@ -67,8 +76,8 @@ class FinancialPredictor:
         
         return df_agg
     
-    def train(self, financial_data: List[Dict]) -> Dict[str, Dict[str, float]]:
-        """Treina os modelos de previsão"""
+    def build_training_series(self, financial_data: List[Dict]) -> Dict[str, pd.DataFrame]:
+        """Séries mensais agregadas por tipo, em ordem cronológica"""
         df = pd.DataFrame(financial_data)
         
         if df.empty:
@@ -77,26 +86,44 @@ class FinancialPredictor:
         df_features = self.prepare_features(df)
         df_agg = self.aggregate_monthly_data(df_features)
         
-        feature_columns = ['year', 'month', 'quarter', 
-                           'months_since_start', 'month_sin', 'month_cos']
+        return {
+            tipo: df_agg[df_agg['tipo'] == tipo].sort_values('competencia').copy()
+            for tipo in ['receita', 'custo']
+        }
+    
+    def train(
+        self,
+        financial_data: List[Dict],
+        model_configs: Optional[Dict[str, Dict]] = None
+    ) -> Dict[str, Dict[str, float]]:
+        """Treina os modelos de previsão
+        
+        `model_configs` mapeia tipo -> {'familia', 'params'} (ex.: vindo do
+        tuning); tipos ausentes usam a configuração padrão.
+        """
+        series = self.build_training_series(financial_data)
+        model_configs = model_configs or {}
+        
+        # Início da série de treino: referência de months_since_start na previsão
+        self.training_start_date = pd.to_datetime(
+            min(df_tipo['competencia'].min() for df_tipo in series.values() if not df_tipo.empty)
+        )
         
         accuracy_scores = {}
         
-        for tipo in ['receita', 'custo']:
-            df_tipo = df_agg[df_agg['tipo'] == tipo].copy()
-            
+        for tipo, df_tipo in series.items():
             if len(df_tipo) < 3:
                 # Dados insuficientes, usar média simples
                 self.models[tipo] = float(np.mean(df_tipo['valor'])) if not df_tipo.empty else 0.0
                 accuracy_scores[tipo] = {"r2": 0.0, "mape": 0.0}
             else:
                 # Dados suficientes, treinar modelo
-                X = df_tipo[feature_columns]
+                X = df_tipo[self.FEATURE_COLUMNS]
                 y = df_tipo['valor']
                 
-                # Garantir que o modelo seja um objeto treinável
-                if isinstance(self.models[tipo], (int, float)):
-                    self.models[tipo] = LinearRegression()
+                config = model_configs.get(tipo) or DEFAULT_CONFIG
+                self.models[tipo] = build_model(config['familia'], config['params'], n_jobs=self.n_jobs)
+                self.model_configs[tipo] = config
                 
                 self.models[tipo].fit(X, y)
                 
@@ -113,6 +140,22 @@ class FinancialPredictor:
         
         return accuracy_scores
     
+    def save(self, path: str) -> None:
+        """Grava o preditor treinado (modelos, encoders e metadados) em disco"""
+        joblib.dump(self, path)
+    
+    @staticmethod
+    def load(path: str) -> 'FinancialPredictor':
+        """Carrega um preditor gravado com save()"""
+        return joblib.load(path)
+    
+    def get_model_families(self) -> Dict[str, str]:
+        """Família do modelo ativo de cada tipo"""
+        return {
+            tipo: self.model_configs.get(tipo, DEFAULT_CONFIG)['familia'] if hasattr(model, 'predict') else 'simple_average'
+            for tipo, model in self.models.items()
+        }
+    
     def predict_future(self, base_date: str, periods: List[int]) -> Dict:
         """Faz previsões para os períodos especificados"""
         if not self.is_trained:
@@ -129,8 +172,8 @@ class FinancialPredictor:
                 'year': future_date.year,
                 'month': future_date.month,
                 'quarter': (future_date.month - 1) // 3 + 1,
-                'months_since_start': (future_date.year - base_datetime.year) * 12 
-                                       + (future_date.month - base_datetime.month),
+                # Mesma tendência usada no treino: meses desde o início dos dados
+                'months_since_start': round((future_date - self.training_start_date).days / 30.44),
                 'month_sin': np.sin(2 * np.pi * future_date.month / 12),
                 'month_cos': np.cos(2 * np.pi * future_date.month / 12)
             }
@@ -157,7 +200,7 @@ class FinancialPredictor:
                     ],
                     'acuracia_r2': r2_val,
                     'acuracia_mape': mape_val,
-                    'modelo_usado': 'random_forest' if hasattr(self.models[tipo], 'predict') else 'simple_average'
+                    'modelo_usado': self.get_model_families()[tipo]
                 }
         
         return predictions
@@ -0,0 +1,41 @@
+import os
+
+# app.models.database cria o engine na importação; usar SQLite em memória
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.database import Base
+
+
+@pytest.fixture
+def db():
+    """Sessão em um SQLite em memória novo (layout não particionado)"""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def make_csv(rows):
+    """Monta um CSV a partir de tuplas (competencia, tipo, categoria, valor)"""
+    lines = ["competencia,tipo,categoria,valor,descricao"]
+    lines += [f"{competencia},{tipo},{categoria},{valor},{categoria} {competencia}" for competencia, tipo, categoria, valor in rows]
+    return "\n".join(lines).encode("utf-8")
+
+
+def monthly_rows(months=24, start_year=2022):
+    """Série mensal com tendência linear de receita e custo"""
+    rows = []
+    for i in range(months):
+        competencia = f"{start_year + i // 12}-{i % 12 + 1:02d}"
+        rows.append((competencia, "receita", "vendas", 1000.0 + 100.0 * i))
+        rows.append((competencia, "custo", "pessoal", 500.0 + 20.0 * i))
+    return rows
@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.models.database import FinancialData, get_db
+from app.services import csv_processor
+from app.services.csv_processor import CSVProcessor
+from app.services.data_service import DataService
+from tests.conftest import make_csv, monthly_rows
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(routes, "data_service", DataService(n_jobs=1, tuning_budget=0))
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_extract_zip_returns_only_csvs_sorted_by_name():
+    content = make_zip([("b.csv", b"x"), ("notas.txt", b"y"), ("__MACOSX/a.csv", b"z"), ("a.csv", b"w")])
+    
+    assert CSVProcessor.extract_zip(content) == [("a.csv", b"w"), ("b.csv", b"x")]
+
+
+def test_extract_zip_rejects_too_many_members(monkeypatch):
+    monkeypatch.setattr(csv_processor, "MAX_ZIP_MEMBERS", 2)
+    content = make_zip([(f"{i}.csv", b"x") for i in range(3)])
+    
+    with pytest.raises(ValueError, match="mais de 2"):
+        CSVProcessor.extract_zip(content)
+
+
+def test_extract_zip_rejects_oversized_members(monkeypatch):
+    monkeypatch.setattr(csv_processor, "MAX_ZIP_MEMBER_SIZE", 100)
+    content = make_zip([("grande.csv", b"0" * 1000)])
+    
+    with pytest.raises(ValueError, match="grande.csv"):
+        CSVProcessor.extract_zip(content)
+
+
+def test_extract_zip_rejects_oversized_total(monkeypatch):
+    monkeypatch.setattr(csv_processor, "MAX_ZIP_TOTAL_SIZE", 1500)
+    content = make_zip([("a.csv", b"0" * 1000), ("b.csv", b"0" * 1000)])
+    
+    with pytest.raises(ValueError, match="tamanho máximo"):
+        CSVProcessor.extract_zip(content)
+
+
+def test_process_many_with_worker_pool_keeps_order_and_names_errors():
+    files = [
+        ("jan.csv", make_csv([("2024-01", "receita", "vendas", 100.0)])),
+        ("fev.csv", make_csv([("2024-02", "custo", "pessoal", 50.0), ("2024-02", "custo", "aluguel", 30.0)])),
+    ]
+    
+    results = CSVProcessor.process_many(files, max_workers=2)
+    assert [len(result) for result in results] == [1, 2]
+    assert results[1][0].competencia == "2024-02"
+    
+    with pytest.raises(ValueError, match="ruim.csv"):
+        CSVProcessor.process_many(files + [("ruim.csv", b"competencia,tipo\n2024-01,receita")], max_workers=2)
+
+
+def test_bulk_upload_skips_ingested_files_and_trains(client, db):
+    content = make_zip([("historico.csv", make_csv(monthly_rows(months=6)))])
+    
+    first = client.post("/api/bulk-upload", files={"file": ("lote.zip", content)})
+    assert first.status_code == 200
+    assert first.json()["registros_salvos"] == 12
+    assert first.json()["modelos_treinados"] is True
+    
+    second = client.post("/api/bulk-upload", files={"file": ("lote.zip", content)})
+    assert second.json()["arquivos_ignorados"] == ["historico.csv"]
+    assert second.json()["modelos_treinados"] is False
+    assert db.query(FinancialData).count() == 12
+
+
+def test_bulk_upload_retrains_on_retry_after_failed_training(client, monkeypatch):
+    content = make_zip([("historico.csv", make_csv(monthly_rows(months=6)))])
+    train_models = routes.data_service.train_models
+    
+    def failing_train(db, *args, **kwargs):
+        raise RuntimeError("falha no treino")
+    monkeypatch.setattr(routes.data_service, "train_models", failing_train)
+    assert client.post("/api/bulk-upload", files={"file": ("lote.zip", content)}).status_code == 400
+    
+    # Na nova tentativa os arquivos já foram ingeridos, mas o treino pendente roda
+    monkeypatch.setattr(routes.data_service, "train_models", train_models)
+    retry = client.post("/api/bulk-upload", files={"file": ("lote.zip", content)})
+    assert retry.status_code == 200
+    assert retry.json()["arquivos_ignorados"] == ["historico.csv"]
+    assert retry.json()["modelos_treinados"] is True
+    assert routes.data_service.predictor.is_trained
@@ -0,0 +1,91 @@
+import json
+
+import pandas as pd
+import pytest
+
+from app import cli
+from app.services.predictor import FinancialPredictor
+from tests.conftest import make_csv, monthly_rows
+
+
+@pytest.fixture
+def run(tmp_path, capsys):
+    """Executa a CLI contra um SQLite em arquivo temporário e devolve (código, saída JSON)"""
+    database_url = f"sqlite:///{tmp_path / 'financial_planner.db'}"
+    
+    def _run(*argv):
+        code = cli.main(["--database-url", database_url, "--n-jobs", "1", *argv])
+        out = capsys.readouterr().out
+        return code, json.loads(out) if code == 0 and out.strip() else None
+    return _run
+
+
+def test_ingest_is_idempotent(run, tmp_path):
+    csv_path = tmp_path / "historico.csv"
+    csv_path.write_bytes(make_csv(monthly_rows(months=6)))
+    
+    code, result = run("ingest", str(csv_path))
+    assert code == 0
+    assert result["registros_salvos"] == 12
+    
+    code, result = run("ingest", str(csv_path))
+    assert result["arquivos_ignorados"] == ["historico.csv"]
+    assert result["registros_salvos"] == 0
+
+
+def test_predict_reuses_predictor_saved_by_train(run, tmp_path, monkeypatch):
+    csv_path = tmp_path / "historico.csv"
+    csv_path.write_bytes(make_csv(monthly_rows(months=12)))
+    run("ingest", str(csv_path))
+    
+    code, _ = run("train", "--orcamento", "0")
+    assert code == 0
+    assert (tmp_path / "financial_planner.modelos.joblib").exists()
+    
+    # Sem dados novos, predict não pode retreinar
+    def fail_train(self, *args, **kwargs):
+        raise AssertionError("predict não deveria retreinar")
+    monkeypatch.setattr(FinancialPredictor, "train", fail_train)
+    
+    code, result = run("predict", "--todas")
+    assert code == 0
+    assert len(result) == 12
+    assert result["2022-12"]["data_base"] == "2022-12"
+
+
+def test_predict_retrains_after_new_data(run, tmp_path):
+    first = tmp_path / "2022.csv"
+    first.write_bytes(make_csv(monthly_rows(months=6)))
+    run("ingest", str(first))
+    run("train", "--orcamento", "0")
+    
+    second = tmp_path / "2023.csv"
+    second.write_bytes(make_csv(monthly_rows(months=6, start_year=2023)))
+    run("ingest", str(second))
+    
+    code, result = run("predict")
+    assert code == 0
+    assert list(result) == ["2023-06"]
+
+
+def test_export_data_and_predictions(run, tmp_path):
+    csv_path = tmp_path / "historico.csv"
+    csv_path.write_bytes(make_csv(monthly_rows(months=6)))
+    run("ingest", str(csv_path))
+    run("predict", "--competencia", "2022-06")
+    
+    code, result = run("export", "dados", "--saida", str(tmp_path / "dados.csv"), "--inicio", "2022-03")
+    assert code == 0
+    assert result["registros_exportados"] == 8
+    assert len(pd.read_csv(tmp_path / "dados.csv")) == 8
+    
+    code, result = run("export", "previsoes", "--saida", str(tmp_path / "previsoes.parquet"))
+    assert code == 0
+    assert result["registros_exportados"] == 4
+    assert set(pd.read_parquet(tmp_path / "previsoes.parquet")["periodo"]) == {30, 60}
+
+
+@pytest.mark.parametrize("value", ["0", "-2", "abc"])
+def test_invalid_n_jobs_is_rejected(value):
+    with pytest.raises(SystemExit):
+        cli.build_parser().parse_args(["--n-jobs", value, "train"])
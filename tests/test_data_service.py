@@ -0,0 +1,37 @@
+from app.models.database import ModelConfig
+from app.services.data_service import DataService
+from tests.conftest import make_csv, monthly_rows
+
+
+def test_train_models_tunes_once_and_reuses_cached_config(db):
+    data_service = DataService(n_jobs=1, tuning_budget=60)
+    data_service.ingest_files(db, [("historico.csv", make_csv(monthly_rows()))], max_workers=1)
+    
+    data_service.train_models(db)
+    configs = {item.tipo: item for item in db.query(ModelConfig).all()}
+    assert set(configs) == {"receita", "custo"}
+    assert configs["receita"].n_amostras == 24
+    
+    # Sem mudança material nos dados, o retreino não pode refazer o tuning
+    def fail_tune(X, y):
+        raise AssertionError("tuning não deveria ser refeito")
+    data_service.tuner.tune = fail_tune
+    data_service.train_models(db)
+    
+    assert data_service.predictor.model_configs["receita"]["familia"] == configs["receita"].familia
+
+
+def test_train_models_does_not_cache_unfinished_tuning(db):
+    data_service = DataService(n_jobs=1, tuning_budget=60)
+    data_service.ingest_files(db, [("historico.csv", make_csv(monthly_rows()))], max_workers=1)
+    
+    # Orçamento esgotado antes da primeira rodada: nada é gravado
+    data_service.tuner.budget_seconds = 0
+    data_service.train_models(db)
+    assert db.query(ModelConfig).count() == 0
+    
+    # Com orçamento, o próximo treino faz o tuning normalmente
+    data_service.tuner.budget_seconds = 60
+    data_service.train_models(db)
+    assert all(item.score is not None for item in db.query(ModelConfig).all())
+    assert db.query(ModelConfig).count() == 2
@@ -0,0 +1,63 @@
+from app.models.database import FinancialData, IngestedFile
+from app.services.data_service import DataService
+from tests.conftest import make_csv
+
+
+def test_ingest_files_skips_already_ingested_checksums(db):
+    data_service = DataService(n_jobs=1, tuning_budget=0)
+    files = [
+        ("2024/jan.csv", make_csv([("2024-01", "receita", "vendas", 100.0)])),
+        ("2025/jan.csv", make_csv([("2025-01", "receita", "vendas", 200.0)])),
+    ]
+    
+    first = data_service.ingest_files(db, files, max_workers=1)
+    assert first["arquivos_processados"] == ["2024/jan.csv", "2025/jan.csv"]
+    assert first["registros_salvos"] == 2
+    
+    second = data_service.ingest_files(db, files, max_workers=1)
+    assert second["arquivos_processados"] == []
+    assert second["arquivos_ignorados"] == ["2024/jan.csv", "2025/jan.csv"]
+    assert second["registros_salvos"] == 0
+    
+    assert db.query(FinancialData).count() == 2
+    assert db.query(IngestedFile).count() == 2
+
+
+def test_ingest_files_skips_duplicate_files_in_same_batch(db):
+    data_service = DataService(n_jobs=1, tuning_budget=0)
+    content = make_csv([("2024-01", "custo", "pessoal", 50.0)])
+    
+    result = data_service.ingest_files(db, [("a.csv", content), ("b.csv", content)], max_workers=1)
+    
+    assert result["arquivos_processados"] == ["a.csv"]
+    assert result["arquivos_ignorados"] == ["b.csv"]
+    assert db.query(FinancialData).count() == 1
+
+
+def test_ingest_files_keeps_identical_rows_within_a_file(db):
+    data_service = DataService(n_jobs=1, tuning_budget=0)
+    content = make_csv([
+        ("2021-01", "receita", "vendas", 100.0),
+        ("2021-01", "receita", "vendas", 200.0),
+    ])
+    
+    result = data_service.ingest_files(db, [("jan.csv", content)], max_workers=1)
+    
+    assert result["registros_processados"] == 2
+    assert result["registros_salvos"] == 2
+    assert sorted(item.valor for item in db.query(FinancialData).all()) == [100.0, 200.0]
+
+
+def test_ingest_files_skips_rows_already_in_database(db):
+    data_service = DataService(n_jobs=1, tuning_budget=0)
+    data_service.ingest_files(db, [("jan.csv", make_csv([("2021-01", "receita", "vendas", 100.0)]))], max_workers=1)
+    
+    # Outro arquivo (checksum diferente) repetindo um lançamento já gravado
+    content = make_csv([
+        ("2021-01", "receita", "vendas", 100.0),
+        ("2021-02", "receita", "vendas", 150.0),
+    ])
+    result = data_service.ingest_files(db, [("jan-fev.csv", content)], max_workers=1)
+    
+    assert result["registros_salvos"] == 1
+    assert db.query(FinancialData).count() == 2
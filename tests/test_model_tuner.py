@@ -0,0 +1,70 @@
+import pandas as pd
+
+from app.services.model_tuner import DEFAULT_CONFIG, MODEL_FAMILIES, ModelTuner
+from app.services.predictor import FinancialPredictor
+from tests.conftest import monthly_rows
+
+
+def _as_financial_data(rows):
+    return [
+        {'competencia': competencia, 'tipo': tipo, 'categoria': categoria, 'valor': valor, 'descricao': ''}
+        for competencia, tipo, categoria, valor in rows
+    ]
+
+
+def _receita_series(months=24):
+    predictor = FinancialPredictor()
+    series = predictor.build_training_series(_as_financial_data(monthly_rows(months)))['receita']
+    return series[FinancialPredictor.FEATURE_COLUMNS], series['valor']
+
+
+def test_needs_retuning_thresholds():
+    y = pd.Series([100.0] * 10)
+    
+    assert ModelTuner.needs_retuning(None, y)
+    assert not ModelTuner.needs_retuning({'n_amostras': 10, 'media': 100.0, 'score': 0.1}, y)
+    # 1 mês a mais (10%) e média 20% diferente: abaixo dos limites
+    assert not ModelTuner.needs_retuning({'n_amostras': 9, 'media': 120.0, 'score': 0.1}, y)
+    # 20% mais meses
+    assert ModelTuner.needs_retuning({'n_amostras': 8, 'media': 100.0, 'score': 0.1}, y)
+    # 25% de variação na média
+    assert ModelTuner.needs_retuning({'n_amostras': 10, 'media': 80.0, 'score': 0.1}, y)
+
+
+def test_needs_retuning_when_cached_config_was_never_scored():
+    # Tuning anterior não concluiu: refaz mesmo sem mudança nos dados
+    assert ModelTuner.needs_retuning({'n_amostras': 10, 'media': 100.0, 'score': None}, pd.Series([100.0] * 10))
+    # Série curta demais para tuning: o padrão sem score é esperado
+    assert not ModelTuner.needs_retuning({'n_amostras': 4, 'media': 100.0, 'score': None}, pd.Series([100.0] * 4))
+
+
+def test_tune_picks_a_candidate_with_validation_score():
+    X, y = _receita_series()
+    
+    config = ModelTuner(budget_seconds=60, n_jobs=1).tune(X, y)
+    
+    assert config['familia'] in MODEL_FAMILIES
+    assert config['score'] is not None
+    assert config['n_amostras'] == 24
+
+
+def test_tune_falls_back_to_default_without_budget_or_data():
+    X, y = _receita_series()
+    assert ModelTuner(budget_seconds=0, n_jobs=1).tune(X, y)['familia'] == DEFAULT_CONFIG['familia']
+    
+    X_short, y_short = _receita_series(months=4)
+    config = ModelTuner(budget_seconds=30, n_jobs=1).tune(X_short, y_short)
+    assert config['params'] == DEFAULT_CONFIG['params']
+    assert config['score'] is None
+
+
+def test_predict_future_uses_trend_from_training_start():
+    predictor = FinancialPredictor()
+    configs = {tipo: {'familia': 'ridge', 'params': {'alpha': 0.001}} for tipo in ['receita', 'custo']}
+    predictor.train(_as_financial_data(monthly_rows(24)), configs)
+    
+    prediction = predictor.predict_future('2023-12', [30])['receita_30d']
+    
+    # Receita cresce 100/mês a partir de 1000: o mês seguinte à série é ~3400
+    assert abs(prediction['valor_previsto'] - 3400.0) / 3400.0 < 0.1
+    assert prediction['modelo_usado'] == 'ridge'
@@ -0,0 +1,37 @@
+from datetime import date
+
+import pytest
+
+from app.models.database import FinancialData
+from app.services.csv_processor import CSVProcessor
+from app.services.data_service import DataService
+from tests.conftest import make_csv, monthly_rows
+
+
+def test_competencia_data_in_sync_for_orm_and_bulk_inserts(db):
+    data_service = DataService(n_jobs=1, tuning_budget=0)
+    db.add(FinancialData(competencia="2024-03", tipo="receita", categoria="vendas", valor=10.0, descricao=""))
+    db.commit()
+    data_service.ingest_files(db, [("abr.csv", make_csv([("2024-04", "receita", "vendas", 20.0)]))], max_workers=1)
+    
+    values = {item.competencia: item.competencia_data for item in db.query(FinancialData).all()}
+    assert values == {"2024-03": date(2024, 3, 1), "2024-04": date(2024, 4, 1)}
+
+
+def test_range_queries_on_competencia_data(db):
+    data_service = DataService(n_jobs=1, tuning_budget=0)
+    data_service.ingest_files(db, [("historico.csv", make_csv(monthly_rows(months=6, start_year=2024)))], max_workers=1)
+    
+    data = data_service.get_financial_data(db, "2024-02", "2024-03")
+    
+    assert {item["competencia"] for item in data} == {"2024-02", "2024-03"}
+    assert len(data) == 4
+    assert data_service.get_latest_competencia(db) == "2024-06"
+    assert data_service.get_competencias(db) == [f"2024-{month:02d}" for month in range(1, 7)]
+
+
+def test_invalid_month_is_reported_with_csv_line():
+    content = make_csv([("2024-12", "receita", "vendas", 10.0), ("2024-13", "receita", "vendas", 20.0)])
+    
+    with pytest.raises(ValueError, match=r"(?s)linha 3.*entre 01 e 12"):
+        CSVProcessor.process_csv(content)